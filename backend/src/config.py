@@ -2,26 +2,30 @@
 
 from __future__ import annotations
 
+import functools
 import os
-from dataclasses import dataclass, field
+import re
+from collections.abc import Mapping
+from typing import NamedTuple
 
 
 def _env(
+    env: Mapping[str, str],
     key: str,
     default: str | None = None,
     *,
     required: bool = False,
 ) -> str:
     """Read an env var with optional default and required check."""
-    value = os.environ.get(key, default)
+    value = env.get(key, default)
     if required and not value:
         raise OSError(f"Missing required environment variable: {key}")
     return value  # type: ignore[return-value]
 
 
-def _env_int(key: str, default: int) -> int:
+def _env_int(env: Mapping[str, str], key: str, default: int) -> int:
     """Read an integer environment variable."""
-    raw = os.environ.get(key)
+    raw = env.get(key)
     if raw is None:
         return default
     try:
@@ -32,39 +36,65 @@ def _env_int(key: str, default: int) -> int:
         ) from exc
 
 
-@dataclass(frozen=True)
-class Settings:
+# Same pattern as the AllowedOrigin parameters in template.yaml, which
+# splits these values verbatim into the HTTP API CORS config.
+_ORIGIN_LIST_RE = re.compile(r"[^\s,]+(,[^\s,]+)*")
+
+
+def _env_origins(env: Mapping[str, str], key: str) -> str:
+    """Read a comma-separated origin list with no spaces or empty items."""
+    value = _env(env, key, "*")
+    if not _ORIGIN_LIST_RE.fullmatch(value):
+        raise OSError(
+            f"Environment variable {key} must be a comma-separated list "
+            f"of origins without spaces, got: {value!r}"
+        )
+    return value
+
+
+def _split_origins(*values: str) -> frozenset[str]:
+    """Merge comma-separated origin lists into one allowlist."""
+    return frozenset(origin for value in values for origin in value.split(","))
+
+
+class Settings(NamedTuple):
     """Application settings — immutable after construction."""
 
-    photos_bucket: str = field(
-        default_factory=lambda: _env("PHOTOS_BUCKET", required=True),
-    )
-    aws_region: str = field(
-        default_factory=lambda: _env("AWS_REGION", "us-east-1"),
-    )
-    presigned_url_expiry_seconds: int = field(
-        default_factory=lambda: _env_int(
-            "PRESIGNED_URL_EXPIRY_SECONDS", 86400
+    photos_bucket: str
+    aws_region: str
+    presigned_url_expiry_seconds: int
+    allowed_origin: str
+    wall_allowed_origin: str
+    max_image_bytes: int
+    cors_origins: frozenset[str]
+
+
+@functools.cache
+def get_settings() -> Settings:
+    """Factory that constructs validated settings from the current env.
+
+    The result is cached for the life of the process; call
+    ``get_settings.cache_clear()`` after changing the environment.
+    """
+    env = os.environ
+    allowed_origin = _env_origins(env, "ALLOWED_ORIGIN")
+    wall_allowed_origin = _env_origins(env, "WALL_ALLOWED_ORIGIN")
+    settings = Settings(
+        photos_bucket=_env(env, "PHOTOS_BUCKET", required=True),
+        aws_region=_env(env, "AWS_REGION", "us-east-1"),
+        presigned_url_expiry_seconds=_env_int(
+            env, "PRESIGNED_URL_EXPIRY_SECONDS", 86400
         ),
-    )
-    allowed_origin: str = field(
-        default_factory=lambda: _env("ALLOWED_ORIGIN", "*"),
-    )
-    wall_allowed_origin: str = field(
-        default_factory=lambda: _env("WALL_ALLOWED_ORIGIN", "*"),
-    )
-    max_image_bytes: int = field(
+        allowed_origin=allowed_origin,
+        wall_allowed_origin=wall_allowed_origin,
         # 10 MB default
-        default_factory=lambda: _env_int("MAX_IMAGE_BYTES", 10_485_760),
+        max_image_bytes=_env_int(env, "MAX_IMAGE_BYTES", 10_485_760),
+        cors_origins=_split_origins(allowed_origin, wall_allowed_origin),
     )
 
-    def __post_init__(self) -> None:
-        if self.presigned_url_expiry_seconds <= 0:
-            raise ValueError("PRESIGNED_URL_EXPIRY_SECONDS must be positive")
-        if self.max_image_bytes <= 0:
-            raise ValueError("MAX_IMAGE_BYTES must be positive")
+    if settings.presigned_url_expiry_seconds <= 0:
+        raise ValueError("PRESIGNED_URL_EXPIRY_SECONDS must be positive")
+    if settings.max_image_bytes <= 0:
+        raise ValueError("MAX_IMAGE_BYTES must be positive")
 
-
-def get_settings() -> Settings:
-    """Factory that constructs validated settings from the current env."""
-    return Settings()
+    return settings
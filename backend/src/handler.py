@@ -2,55 +2,108 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import sys
 
+import boto3
+import orjson
+from botocore.config import Config
+
 from .config import get_settings
 from .exceptions import PhotoboothError
 from .photos import get_random_photo
-from .upload import upload_image
+
+# Characters that must be escaped inside a JSON string literal
+_JSON_ESCAPE = {i: f"\\u{i:04x}" for i in range(0x20)} | {
+    ord('"'): '\\"',
+    ord("\\"): "\\\\",
+}
+
+
+class _JsonFormatter(logging.Formatter):
+    """Render each log record as a single-line JSON object."""
+
+    _TEMPLATE = (
+        '{{"level":"{level}","logger":"{name}",'
+        '"message":"{msg}","time":"{time}"{extra}}}'
+    )
+
+    def format(self, record: logging.LogRecord) -> str:
+        extra = ""
+        # Cache the traceback on the record like logging.Formatter does,
+        # so multiple handlers only format it once.
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            extra += (
+                f',"exception":"{record.exc_text.translate(_JSON_ESCAPE)}"'
+            )
+        if record.stack_info:
+            stack = self.formatStack(record.stack_info)
+            extra += f',"stack":"{stack.translate(_JSON_ESCAPE)}"'
+        return self._TEMPLATE.format(
+            level=record.levelname,
+            name=record.name,
+            msg=record.getMessage().translate(_JSON_ESCAPE),
+            time=self.formatTime(record),
+            extra=extra,
+        )
+
 
 # Configure structured logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(
-    logging.Formatter(
-        '{"level":"%(levelname)s","logger":"%(name)s",'
-        '"message":"%(message)s","time":"%(asctime)s"}'
-    )
-)
+handler.setFormatter(_JsonFormatter())
 logger.addHandler(handler)
 
+# Resolved once during the Lambda init phase: warm invocations reuse
+# them, and bad configuration fails init instead of every request.
+_SETTINGS = get_settings()
+_S3_CONFIG = Config(
+    region_name=_SETTINGS.aws_region,
+    retries={"max_attempts": 2, "mode": "standard"},
+    connect_timeout=1.0,
+    read_timeout=5.0,
+    tcp_keepalive=True,
+    max_pool_connections=4,
+    # upload_image supplies Content-MD5, so skip the default CRC32
+    request_checksum_calculation="when_required",
+)
+_S3 = boto3.client("s3", config=_S3_CONFIG)
+
 
-def _cors_headers(origin: str = "*") -> dict:
-    """Return CORS headers restricted to the allowed origin."""
+def _response_headers(origin: str = "*") -> dict:
+    """Return response headers with CORS restricted to the given origin."""
     return {
         "Access-Control-Allow-Origin": origin,
         "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
         "Access-Control-Allow-Headers": "Content-Type",
+        "Content-Type": "application/json",
     }
 
 
-def _resolve_origin(event: dict, settings) -> str:
-    """Resolve response CORS origin for booth and wall frontends."""
+_FORBIDDEN_ORIGIN_BODY = orjson.dumps(
+    {"error": "FORBIDDEN_ORIGIN", "message": "Origin not allowed"}
+).decode()
+
+
+def _resolve_origin(event: dict, settings) -> str | None:
+    """Resolve response CORS origin for booth and wall frontends.
+
+    Returns ``None`` when the request's origin is not on the allowlist.
+    """
+    if "*" in settings.cors_origins:
+        return "*"
+
     request_headers = event.get("headers") or {}
     request_origin = request_headers.get("origin") or request_headers.get(
         "Origin"
     )
-    configured_origins = [
-        settings.allowed_origin,
-        settings.wall_allowed_origin,
-    ]
-
-    if "*" in configured_origins:
-        return "*"
-
-    if request_origin and request_origin in configured_origins:
+    if request_origin in settings.cors_origins:
         return request_origin
 
-    return settings.allowed_origin
+    return None
 
 
 def _request_path(event: dict) -> str:
@@ -67,71 +120,100 @@ def _response(
     """Build an API Gateway-compatible response dict."""
     return {
         "statusCode": status_code,
-        "headers": {
-            **_cors_headers(origin),
-            "Content-Type": "application/json",
-        },
-        "body": json.dumps(body),
+        "headers": _response_headers(origin),
+        "body": orjson.dumps(body).decode(),
     }
 
 
-def lambda_handler(event: dict, context: object) -> dict:
-    """Lambda entry point for API Gateway HTTP API integration."""
-    settings = get_settings()
-    origin = _resolve_origin(event, settings)
+def _preflight_response(origin: str = "*") -> dict:
+    """Return a CORS preflight response with a constant, unserialised body."""
+    return {
+        "statusCode": 204,
+        "headers": _response_headers(origin),
+        "body": "{}",
+    }
 
-    # Handle CORS preflight
-    http_method = (
-        event.get("requestContext", {})
-        .get("http", {})
-        .get("method", event.get("httpMethod", ""))
-    )
+
+def _handle_options(event: dict, settings, origin: str) -> dict:
+    """Answer a CORS preflight without touching the request."""
+    return _preflight_response(origin)
+
+
+def _handle_get(event: dict, settings, origin: str) -> dict:
+    """Route GET requests for the booth and wall frontends."""
     request_path = _request_path(event)
+    if request_path.endswith("/upload-url"):
+        return _get_upload_url(settings, origin)
+    if request_path.endswith("/photos/random"):
+        return _get_random_photo(settings, origin)
 
-    if http_method == "OPTIONS":
-        return _response(204, {}, origin)
-
-    if http_method == "GET":
-        if not request_path.endswith("/photos/random"):
-            return _response(
-                405,
-                {
-                    "error": "METHOD_NOT_ALLOWED",
-                    "message": "Use POST /upload or GET /photos/random",
-                },
-                origin,
-            )
+    return _response(
+        405,
+        {
+            "error": "METHOD_NOT_ALLOWED",
+            "message": (
+                "Use POST /upload, GET /upload-url or GET /photos/random"
+            ),
+        },
+        origin,
+    )
 
-        try:
-            result = get_random_photo(settings)
-        except PhotoboothError as exc:
-            logger.warning(
-                "Photo fetch rejected: %s — %s",
-                exc.error_code,
-                exc.message,
-            )
-            return _response(exc.status_code, exc.to_dict(), origin)
-        except Exception:
-            logger.exception("Unhandled error during photo fetch")
-            return _response(
-                500,
-                {
-                    "error": "INTERNAL_ERROR",
-                    "message": "An unexpected error occurred",
-                },
-                origin,
-            )
 
-        return _response(200, result, origin)
+def _get_upload_url(settings, origin: str) -> dict:
+    """Serve GET /upload-url so the booth can upload straight to S3."""
+    from .upload import create_upload_url
 
-    # Only accept POST
-    if http_method != "POST":
+    try:
+        result = create_upload_url(settings, _S3)
+    except PhotoboothError as exc:
+        logger.warning(
+            "Upload URL rejected: %s — %s",
+            exc.error_code,
+            exc.message,
+        )
+        return _response(exc.status_code, exc.to_dict(), origin)
+    except Exception:
+        logger.exception("Unhandled error during upload URL generation")
         return _response(
-            405,
-            {"error": "METHOD_NOT_ALLOWED", "message": "Use POST"},
+            500,
+            {
+                "error": "INTERNAL_ERROR",
+                "message": "An unexpected error occurred",
+            },
+            origin,
+        )
+
+    return _response(200, result, origin)
+
+
+def _get_random_photo(settings, origin: str) -> dict:
+    """Serve GET /photos/random for the wall slideshow."""
+    try:
+        result = get_random_photo(settings, _S3)
+    except PhotoboothError as exc:
+        logger.warning(
+            "Photo fetch rejected: %s — %s",
+            exc.error_code,
+            exc.message,
+        )
+        return _response(exc.status_code, exc.to_dict(), origin)
+    except Exception:
+        logger.exception("Unhandled error during photo fetch")
+        return _response(
+            500,
+            {
+                "error": "INTERNAL_ERROR",
+                "message": "An unexpected error occurred",
+            },
             origin,
         )
 
+    return _response(200, result, origin)
+
+
+def _handle_post(event: dict, settings, origin: str) -> dict:
+    """Serve POST /upload for the booth frontend."""
+    request_path = _request_path(event)
     if request_path and not request_path.endswith("/upload"):
         return _response(
             404,
@@ -141,8 +223,8 @@ def lambda_handler(event: dict, context: object) -> dict:
 
     # Parse body
     try:
-        body = json.loads(event.get("body", "{}") or "{}")
-    except (json.JSONDecodeError, TypeError):
+        body = orjson.loads(event.get("body", "{}") or "{}")
+    except (orjson.JSONDecodeError, TypeError):
         return _response(
             400,
             {
@@ -152,8 +234,7 @@ def lambda_handler(event: dict, context: object) -> dict:
             origin,
         )
 
-    image_data = body.get("image")
-    if not image_data:
+    if not body.get("image"):
         return _response(
             400,
             {
@@ -163,8 +244,14 @@ def lambda_handler(event: dict, context: object) -> dict:
             origin,
         )
 
+    # Deferred so preflight and rejected requests skip loading the
+    # upload module (and pybase64) on a cold start.
+    from .upload import upload_image
+
     try:
-        result = upload_image(image_data, settings)
+        # Popped rather than bound to a local so upload_image holds the
+        # only reference to the decoded-JSON string and can free it.
+        result = upload_image(body.pop("image"), settings, _S3)
     except PhotoboothError as exc:
         logger.warning(
             "Upload rejected: %s — %s",
@@ -184,3 +271,41 @@ def lambda_handler(event: dict, context: object) -> dict:
         )
 
     return _response(200, result, origin)
+
+
+_METHOD_HANDLERS = {
+    "OPTIONS": _handle_options,
+    "GET": _handle_get,
+    "POST": _handle_post,
+}
+
+
+def lambda_handler(event: dict, context: object) -> dict:
+    """Lambda entry point for API Gateway HTTP API integration."""
+    settings = _SETTINGS
+    origin = _resolve_origin(event, settings)
+    if origin is None:
+        # Reject cross-site callers before parsing or touching S3. No
+        # Access-Control-Allow-Origin at all: even "null" would let
+        # sandboxed iframes and file:// pages read the response.
+        return {
+            "statusCode": 403,
+            "headers": {"Content-Type": "application/json"},
+            "body": _FORBIDDEN_ORIGIN_BODY,
+        }
+
+    http_method = (
+        event.get("requestContext", {})
+        .get("http", {})
+        .get("method", event.get("httpMethod", ""))
+    )
+
+    method_handler = _METHOD_HANDLERS.get(http_method)
+    if method_handler is None:
+        return _response(
+            405,
+            {"error": "METHOD_NOT_ALLOWED", "message": "Use POST"},
+            origin,
+        )
+
+    return method_handler(event, settings, origin)
@@ -4,18 +4,12 @@ from __future__ import annotations
 
 import random
 
-import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 
 from .config import Settings
 from .exceptions import NoPhotosAvailableError, PhotoFetchFailedError
 
 
-def _get_s3_client(region: str):
-    """Create a regional S3 client."""
-    return boto3.client("s3", region_name=region)
-
-
 def _list_photo_keys(
     client,
     bucket: str,
@@ -37,10 +31,9 @@ def _list_photo_keys(
     return keys
 
 
-def get_random_photo(settings: Settings, s3_client=None) -> dict:
+def get_random_photo(settings: Settings, s3_client) -> dict:
     """Return a random photo key and a presigned inline-view URL."""
-    client = s3_client or _get_s3_client(settings.aws_region)
-    keys = _list_photo_keys(client, settings.photos_bucket)
+    keys = _list_photo_keys(s3_client, settings.photos_bucket)
 
     if not keys:
         raise NoPhotosAvailableError()
@@ -49,7 +42,7 @@ def get_random_photo(settings: Settings, s3_client=None) -> dict:
     filename = key.rsplit("/", 1)[-1] or "photo.jpg"
 
     try:
-        presigned_url = client.generate_presigned_url(
+        presigned_url = s3_client.generate_presigned_url(
             "get_object",
             Params={
                 "Bucket": settings.photos_bucket,
@@ -1,12 +1,13 @@
-"""Upload logic — decode image, store in S3, return presigned URL."""
+"""Upload logic — store images in S3 and return presigned URLs."""
 
 from __future__ import annotations
 
-import base64
+import hashlib
+import io
 import logging
-import uuid
+import os
 
-import boto3
+import pybase64
 from botocore.exceptions import ClientError
 
 from .config import Settings
@@ -18,6 +19,13 @@ from .exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# Browsers upload straight after asking, so the POST policy is short-lived
+UPLOAD_URL_EXPIRY_SECONDS = 300
+
+# A 409 means another conditional write to the key is still in flight;
+# it proves nothing landed, so the PUT is re-issued this many times.
+_CONFLICT_RETRIES = 1
+
 
 def _decode_image(base64_data: str, max_bytes: int) -> bytes:
     """Validate and decode a base64-encoded JPEG image."""
@@ -25,12 +33,28 @@ def _decode_image(base64_data: str, max_bytes: int) -> bytes:
         raise InvalidImageError("Empty image payload")
 
     # Strip optional data-URI prefix
-    if "," in base64_data[:64]:
-        base64_data = base64_data.split(",", 1)[1]
+    if base64_data.startswith("data:"):
+        _, _, base64_data = base64_data.partition(",")
+        if not base64_data:
+            raise InvalidImageError("Data URI has no image payload")
+
+    # Base64 is 4:3, so the payload length bounds the decoded size
+    # (padding accounts for at most 2 bytes of slack).
+    approx_len = (len(base64_data) * 3) // 4
+    if approx_len > max_bytes + 2:
+        raise ImageTooLargeError(
+            f"Image size ~{approx_len} bytes exceeds "
+            f"limit of {max_bytes} bytes"
+        )
+
+    # Minimal JPEG magic-byte check: FF D8 FF always encodes to "/9j/",
+    # so non-JPEGs are rejected before the decoder runs at all.
+    if not base64_data.startswith("/9j/"):
+        raise InvalidImageError("Image does not appear to be a valid JPEG")
 
     try:
-        raw = base64.b64decode(base64_data, validate=True)
-    except Exception as exc:
+        raw = pybase64.b64decode(base64_data, validate=True)
+    except ValueError as exc:
         raise InvalidImageError("Image is not valid base64") from exc
 
     if len(raw) > max_bytes:
@@ -39,22 +63,43 @@ def _decode_image(base64_data: str, max_bytes: int) -> bytes:
             f"limit of {max_bytes} bytes"
         )
 
-    # Minimal JPEG magic-byte check (FFD8)
-    if not raw[:2] == b"\xff\xd8":
-        raise InvalidImageError("Image does not appear to be a valid JPEG")
-
     return raw
 
 
-def _get_s3_client(region: str):
-    """Create a regional S3 client."""
-    return boto3.client("s3", region_name=region)
+def _new_photo_key() -> str:
+    """Return a fresh, unguessable object key under the photos prefix."""
+    return f"photos/{os.urandom(16).hex()}.jpg"
+
+
+def _download_url(settings: Settings, s3_client, key: str) -> str:
+    """Presign a GET that downloads the photo as an attachment."""
+    try:
+        return s3_client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": settings.photos_bucket,
+                "Key": key,
+                "ResponseContentDisposition": "attachment; filename=photo.jpg",
+                "ResponseContentType": "image/jpeg",
+            },
+            ExpiresIn=settings.presigned_url_expiry_seconds,
+        )
+    except ClientError as exc:
+        logger.error(
+            "Presigned URL generation failed for key=%s: %s: %s",
+            key,
+            type(exc).__name__,
+            exc,
+        )
+        raise UploadFailedError(
+            f"Could not generate download URL: {exc}"
+        ) from exc
 
 
 def upload_image(
     base64_data: str,
     settings: Settings,
-    s3_client=None,
+    s3_client,
 ) -> dict:
     """Decode, upload to S3, and return a presigned download URL.
 
@@ -64,38 +109,104 @@ def upload_image(
         {"key": "<s3 key>", "url": "<presigned URL>"}
     """
     image_bytes = _decode_image(base64_data, settings.max_image_bytes)
+    # The handler passes the only reference, so this frees the encoded
+    # payload before put_object buffers the request.
+    del base64_data
+
+    key = _new_photo_key()
+    # Sending Content-MD5 lets S3 verify the body without botocore also
+    # streaming a CRC32 trailer over it.
+    content_md5 = pybase64.b64encode(
+        hashlib.md5(image_bytes, usedforsecurity=False).digest()
+    ).decode()
+
+    for attempt in range(_CONFLICT_RETRIES + 1):
+        try:
+            s3_client.put_object(
+                Bucket=settings.photos_bucket,
+                Key=key,
+                # BytesIO shares the bytes buffer rather than copying it
+                Body=io.BytesIO(image_bytes),
+                ContentType="image/jpeg",
+                ContentMD5=content_md5,
+                # A retried PUT becomes a cheap 412 instead of a rewrite
+                IfNoneMatch="*",
+            )
+            break
+        except ClientError as exc:
+            error_code = exc.response.get("Error", {}).get("Code")
+            # Keys are random, so a 412 can only mean an earlier attempt
+            # of this same upload has landed.
+            if error_code == "PreconditionFailed":
+                logger.info(
+                    "Upload of %s already landed on a prior attempt", key
+                )
+                break
+            if (
+                error_code == "ConditionalRequestConflict"
+                and attempt < _CONFLICT_RETRIES
+            ):
+                logger.info(
+                    "Write to %s still in flight, retrying put_object", key
+                )
+                continue
+            # Deliberately no traceback: the S3 error code and message
+            # below are all that gets logged for this failure.
+            logger.error(
+                "S3 put_object failed for key=%s: %s: %s",
+                key,
+                type(exc).__name__,
+                exc,
+            )
+            raise UploadFailedError(f"S3 upload failed: {exc}") from exc
+
+    presigned_url = _download_url(settings, s3_client, key)
+
+    logger.info("Uploaded %s (%d bytes)", key, len(image_bytes))
+
+    return {"key": key, "url": presigned_url}
 
-    key = f"photos/{uuid.uuid4().hex}.jpg"
-    client = s3_client or _get_s3_client(settings.aws_region)
+
+def create_upload_url(settings: Settings, s3_client) -> dict:
+    """Presign a direct browser-to-S3 POST for a new photo.
+
+    The image bytes never pass through Lambda. The signed policy only
+    caps the size and pins the Content-Type form field the browser sends;
+    unlike ``upload_image`` nothing checks that the bytes are a JPEG, so
+    whatever lands under ``photos/`` is served to the wall as-is.
+
+    Returns
+    -------
+    dict
+        {"key": "<s3 key>", "upload": {"url": ..., "fields": {...}},
+        "url": "<presigned download URL>"}
+    """
+    key = _new_photo_key()
 
     try:
-        client.put_object(
+        upload = s3_client.generate_presigned_post(
             Bucket=settings.photos_bucket,
             Key=key,
-            Body=image_bytes,
-            ContentType="image/jpeg",
+            Fields={"Content-Type": "image/jpeg"},
+            Conditions=[
+                {"Content-Type": "image/jpeg"},
+                ["content-length-range", 1, settings.max_image_bytes],
+            ],
+            ExpiresIn=UPLOAD_URL_EXPIRY_SECONDS,
         )
     except ClientError as exc:
-        logger.exception("S3 put_object failed for key=%s", key)
-        raise UploadFailedError(f"S3 upload failed: {exc}") from exc
-
-    try:
-        presigned_url = client.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": settings.photos_bucket,
-                "Key": key,
-                "ResponseContentDisposition": "attachment; filename=photo.jpg",
-                "ResponseContentType": "image/jpeg",
-            },
-            ExpiresIn=settings.presigned_url_expiry_seconds,
+        logger.error(
+            "Presigned POST generation failed for key=%s: %s: %s",
+            key,
+            type(exc).__name__,
+            exc,
         )
-    except ClientError as exc:
-        logger.exception("Presigned URL generation failed")
         raise UploadFailedError(
-            f"Could not generate download URL: {exc}"
+            f"Could not generate upload URL: {exc}"
         ) from exc
 
-    logger.info("Uploaded %s (%d bytes)", key, len(image_bytes))
-
-    return {"key": key, "url": presigned_url}
+    return {
+        "key": key,
+        "upload": upload,
+        "url": _download_url(settings, s3_client, key),
+    }
@@ -3,26 +3,41 @@
 from __future__ import annotations
 
 import base64
+import os
 import struct
 
 import boto3
 import pytest
 from moto import mock_aws
 
+from backend.src.config import get_settings
+
+TEST_ENV = {
+    "PHOTOS_BUCKET": "test-photos",
+    "AWS_REGION": "us-east-1",
+    "PRESIGNED_URL_EXPIRY_SECONDS": "3600",
+    "ALLOWED_ORIGIN": "*",
+    "WALL_ALLOWED_ORIGIN": "*",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_SECURITY_TOKEN": "testing",
+    "AWS_SESSION_TOKEN": "testing",
+    "AWS_DEFAULT_REGION": "us-east-1",
+}
+
+# handler.py builds its settings and S3 client at import time, so the
+# env must be in place before any test module imports it.
+os.environ.update(TEST_ENV)
+
 
 @pytest.fixture(autouse=True)
 def _env_setup(monkeypatch):
     """Set required env vars for every test."""
-    monkeypatch.setenv("PHOTOS_BUCKET", "test-photos")
-    monkeypatch.setenv("AWS_REGION", "us-east-1")
-    monkeypatch.setenv("PRESIGNED_URL_EXPIRY_SECONDS", "3600")
-    monkeypatch.setenv("ALLOWED_ORIGIN", "*")
-    monkeypatch.setenv("WALL_ALLOWED_ORIGIN", "*")
-    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
-    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
-    monkeypatch.setenv("AWS_SECURITY_TOKEN", "testing")
-    monkeypatch.setenv("AWS_SESSION_TOKEN", "testing")
-    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    for key, value in TEST_ENV.items():
+        monkeypatch.setenv(key, value)
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
 
 
 @pytest.fixture()
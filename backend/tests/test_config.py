@@ -0,0 +1,69 @@
+"""Tests for environment-driven settings."""
+
+from __future__ import annotations
+
+import pytest
+
+from backend.src.config import get_settings
+
+
+class TestGetSettings:
+    """Unit tests for get_settings()."""
+
+    def test_reads_env(self):
+        settings = get_settings()
+
+        assert settings.photos_bucket == "test-photos"
+        assert settings.presigned_url_expiry_seconds == 3600
+        assert settings.max_image_bytes == 10_485_760
+
+    def test_result_is_cached(self):
+        assert get_settings() is get_settings()
+
+    def test_missing_bucket_raises(self, monkeypatch):
+        monkeypatch.delenv("PHOTOS_BUCKET")
+
+        with pytest.raises(OSError, match="PHOTOS_BUCKET"):
+            get_settings()
+
+    def test_non_integer_value_raises(self, monkeypatch):
+        monkeypatch.setenv("MAX_IMAGE_BYTES", "lots")
+
+        with pytest.raises(OSError, match="must be an integer"):
+            get_settings()
+
+    @pytest.mark.parametrize(
+        "key",
+        ["PRESIGNED_URL_EXPIRY_SECONDS", "MAX_IMAGE_BYTES"],
+    )
+    def test_non_positive_value_raises(self, monkeypatch, key):
+        monkeypatch.setenv(key, "0")
+
+        with pytest.raises(ValueError, match=key):
+            get_settings()
+
+    def test_cors_origins_merge_both_lists(self, monkeypatch):
+        monkeypatch.setenv(
+            "ALLOWED_ORIGIN", "https://a.example.com,https://b.example.com"
+        )
+        monkeypatch.setenv("WALL_ALLOWED_ORIGIN", "https://wall.example.com")
+
+        assert get_settings().cors_origins == {
+            "https://a.example.com",
+            "https://b.example.com",
+            "https://wall.example.com",
+        }
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "https://a.example.com, https://b.example.com",
+            "https://a.com,,",
+            "",
+        ],
+    )
+    def test_malformed_origin_list_raises(self, monkeypatch, value):
+        monkeypatch.setenv("ALLOWED_ORIGIN", value)
+
+        with pytest.raises(OSError, match="ALLOWED_ORIGIN"):
+            get_settings()
@@ -0,0 +1,61 @@
+"""Tests for the Lambda handler's logging helpers."""
+
+from __future__ import annotations
+
+import json
+import logging
+import sys
+
+from backend.src import handler
+
+
+class TestJsonFormatter:
+    """Tests for the structured log formatter."""
+
+    def _record(self, msg, *args, exc_info=None, sinfo=None):
+        return logging.LogRecord(
+            "backend.src.upload",
+            logging.WARNING,
+            __file__,
+            1,
+            msg,
+            args,
+            exc_info,
+            sinfo=sinfo,
+        )
+
+    def test_message_with_quotes_is_valid_json(self):
+        record = self._record('bad "key"\n%s', "C:\\tmp")
+        line = handler._JsonFormatter().format(record)
+
+        parsed = json.loads(line)
+        assert parsed["level"] == "WARNING"
+        assert parsed["logger"] == "backend.src.upload"
+        assert parsed["message"] == 'bad "key"\nC:\\tmp'
+
+    def test_exception_is_included(self):
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            record = self._record("failed", exc_info=sys.exc_info())
+
+        parsed = json.loads(handler._JsonFormatter().format(record))
+        assert "RuntimeError: boom" in parsed["exception"]
+
+    def test_cached_exception_text_is_reused(self):
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            record = self._record("failed", exc_info=sys.exc_info())
+        record.exc_text = "cached traceback"
+
+        parsed = json.loads(handler._JsonFormatter().format(record))
+        assert parsed["exception"] == "cached traceback"
+
+    def test_stack_info_is_included(self):
+        record = self._record(
+            "here", sinfo='Stack (most recent call last):\n  "x"'
+        )
+
+        parsed = json.loads(handler._JsonFormatter().format(record))
+        assert parsed["stack"] == 'Stack (most recent call last):\n  "x"'
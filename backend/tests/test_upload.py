@@ -2,14 +2,21 @@
 
 from __future__ import annotations
 
+import base64
+import hashlib
 import json
+import logging
 
 import pytest
+from botocore.stub import Stubber
 from moto import mock_aws
 
+from backend.src import handler
+from backend.src import upload as upload_module
 from backend.src.config import get_settings
+from backend.src.exceptions import UploadFailedError
 from backend.src.handler import lambda_handler
-from backend.src.upload import upload_image
+from backend.src.upload import create_upload_url, upload_image
 from backend.tests.conftest import make_jpeg_base64
 
 # ── upload_image unit tests ──────────────────────────────────
@@ -33,6 +40,127 @@ class TestUploadImage:
         assert "url" in result
         assert "test-photos" in result["url"]
 
+    def test_uploaded_object_matches_decoded_image(self, s3_bucket):
+        settings = get_settings()
+        image_b64 = make_jpeg_base64(size=512)
+        result = upload_image(image_b64, settings, s3_client=s3_bucket)
+
+        stored = s3_bucket.get_object(Bucket="test-photos", Key=result["key"])
+        assert stored["Body"].read() == base64.b64decode(image_b64)
+        assert stored["ContentType"] == "image/jpeg"
+
+    def test_data_uri_prefix_is_stripped(self, s3_bucket):
+        settings = get_settings()
+        result = upload_image(
+            "data:image/jpeg;base64," + make_jpeg_base64(),
+            settings,
+            s3_client=s3_bucket,
+        )
+        assert result["key"].startswith("photos/")
+
+    def test_data_uri_without_payload_raises(self, s3_bucket):
+        settings = get_settings()
+        with pytest.raises(Exception, match="no image payload"):
+            upload_image(
+                "data:image/jpeg;base64,", settings, s3_client=s3_bucket
+            )
+
+    def test_put_sends_content_md5_without_crc_trailer(self, s3_bucket):
+        settings = get_settings()
+        image_b64 = make_jpeg_base64(size=512)
+        sent_headers = {}
+
+        def capture(request, **kwargs):
+            sent_headers.update(request.headers)
+
+        # The handler's shared client carries the production checksum config
+        client = handler._S3
+        client.meta.events.register("before-send.s3.PutObject", capture)
+        try:
+            upload_image(image_b64, settings, s3_client=client)
+        finally:
+            client.meta.events.unregister("before-send.s3.PutObject", capture)
+
+        expected = base64.b64encode(
+            hashlib.md5(base64.b64decode(image_b64)).digest()
+        ).decode()
+        headers = {k.lower(): v for k, v in sent_headers.items()}
+        assert headers["content-md5"] == expected.encode()
+        assert not any(k.startswith("x-amz-checksum-") for k in headers)
+        assert "x-amz-trailer" not in headers
+
+    def test_existing_key_is_treated_as_uploaded(self, s3_bucket, monkeypatch):
+        settings = get_settings()
+        image_b64 = make_jpeg_base64()
+        monkeypatch.setattr(
+            upload_module, "_new_photo_key", lambda: "photos/retried.jpg"
+        )
+        s3_bucket.put_object(
+            Bucket="test-photos",
+            Key="photos/retried.jpg",
+            Body=base64.b64decode(image_b64),
+        )
+
+        result = upload_image(image_b64, settings, s3_client=s3_bucket)
+        assert result["key"] == "photos/retried.jpg"
+
+    def test_s3_failure_logs_without_traceback(self, s3_bucket, caplog):
+        settings = get_settings()
+        s3_bucket.delete_bucket(Bucket="test-photos")
+
+        with pytest.raises(UploadFailedError, match="S3 upload failed"):
+            upload_image(make_jpeg_base64(), settings, s3_client=s3_bucket)
+
+        (record,) = [r for r in caplog.records if r.levelno == logging.ERROR]
+        assert "NoSuchBucket" in record.getMessage()
+        assert record.exc_info is None
+
+    def _stub_conflict(self, stubber):
+        # moto only produces 412, so fake the 409 S3 returns while an
+        # earlier attempt is still writing the key.
+        stubber.add_client_error(
+            "put_object",
+            service_error_code="ConditionalRequestConflict",
+            http_status_code=409,
+        )
+
+    def test_in_flight_conflict_then_412_is_uploaded(self, s3_bucket):
+        settings = get_settings()
+        with Stubber(s3_bucket) as stubber:
+            self._stub_conflict(stubber)
+            stubber.add_client_error(
+                "put_object",
+                service_error_code="PreconditionFailed",
+                http_status_code=412,
+            )
+            result = upload_image(
+                make_jpeg_base64(), settings, s3_client=s3_bucket
+            )
+            stubber.assert_no_pending_responses()
+
+        assert result["key"].startswith("photos/")
+
+    def test_repeated_conflict_raises(self, s3_bucket):
+        settings = get_settings()
+        with Stubber(s3_bucket) as stubber:
+            self._stub_conflict(stubber)
+            self._stub_conflict(stubber)
+            with pytest.raises(UploadFailedError, match="S3 upload failed"):
+                upload_image(make_jpeg_base64(), settings, s3_client=s3_bucket)
+            stubber.assert_no_pending_responses()
+
+    def test_in_flight_conflict_then_success_uploads(self, s3_bucket):
+        settings = get_settings()
+        with Stubber(s3_bucket) as stubber:
+            self._stub_conflict(stubber)
+            stubber.add_response("put_object", {})
+            result = upload_image(
+                make_jpeg_base64(), settings, s3_client=s3_bucket
+            )
+            stubber.assert_no_pending_responses()
+
+        assert result["key"].startswith("photos/")
+
     def test_empty_payload_raises(self, s3_bucket):
         settings = get_settings()
         with pytest.raises(Exception, match="Empty image"):
@@ -41,18 +169,17 @@ class TestUploadImage:
     def test_invalid_base64_raises(self, s3_bucket):
         settings = get_settings()
         with pytest.raises(Exception, match="not valid base64"):
-            upload_image("!!!invalid!!!", settings, s3_client=s3_bucket)
+            upload_image("/9j/!!!invalid!!!", settings, s3_client=s3_bucket)
 
     def test_non_jpeg_raises(self, s3_bucket):
         settings = get_settings()
-        import base64
-
         png_b64 = base64.b64encode(b"\x89PNG" + b"\x00" * 100).decode()
         with pytest.raises(Exception, match="valid JPEG"):
             upload_image(png_b64, settings, s3_client=s3_bucket)
 
     def test_oversized_image_raises(self, s3_bucket, monkeypatch):
         monkeypatch.setenv("MAX_IMAGE_BYTES", "10")
+        get_settings.cache_clear()
         settings = get_settings()
         with pytest.raises(Exception, match="exceeds"):
             upload_image(
@@ -61,6 +188,46 @@ class TestUploadImage:
                 s3_client=s3_bucket,
             )
 
+    def test_image_at_size_limit_succeeds(self, s3_bucket, monkeypatch):
+        monkeypatch.setenv("MAX_IMAGE_BYTES", "256")
+        get_settings.cache_clear()
+        settings = get_settings()
+        result = upload_image(
+            make_jpeg_base64(size=256),
+            settings,
+            s3_client=s3_bucket,
+        )
+        assert result["key"].startswith("photos/")
+
+
+@mock_aws
+class TestCreateUploadUrl:
+    """Tests for create_upload_url()."""
+
+    def test_returns_presigned_post_and_download_url(self, s3_bucket):
+        settings = get_settings()
+        result = create_upload_url(settings, s3_client=s3_bucket)
+
+        assert result["key"].startswith("photos/")
+        assert result["key"].endswith(".jpg")
+        assert "test-photos" in result["upload"]["url"]
+        fields = result["upload"]["fields"]
+        assert fields["key"] == result["key"]
+        assert fields["Content-Type"] == "image/jpeg"
+        assert "policy" in fields
+        assert "test-photos" in result["url"]
+
+    def test_policy_enforces_size_limit(self, s3_bucket, monkeypatch):
+        monkeypatch.setenv("MAX_IMAGE_BYTES", "2048")
+        get_settings.cache_clear()
+        settings = get_settings()
+        result = create_upload_url(settings, s3_client=s3_bucket)
+
+        policy = json.loads(
+            base64.b64decode(result["upload"]["fields"]["policy"])
+        )
+        assert ["content-length-range", 1, 2048] in policy["conditions"]
+
 
 # ── lambda_handler integration tests ────────────────────────
 
@@ -108,11 +275,48 @@ class TestLambdaHandler:
         resp = lambda_handler(self._make_event("OPTIONS"), None)
         assert resp["statusCode"] == 204
 
+    def test_preflight_responses_are_independent(self):
+        self._setup_bucket()
+        first = lambda_handler(self._make_event("OPTIONS"), None)
+        first["statusCode"] = 500
+        first["headers"]["X-Injected"] = "1"
+
+        second = lambda_handler(self._make_event("OPTIONS"), None)
+        assert second["statusCode"] == 204
+        assert "X-Injected" not in second["headers"]
+
     def test_get_returns_405(self):
         self._setup_bucket()
         resp = lambda_handler(self._make_event("GET"), None)
         assert resp["statusCode"] == 405
 
+    def test_mutating_response_headers_does_not_leak(self):
+        self._setup_bucket()
+        first = lambda_handler(self._make_event("GET"), None)
+        first["headers"]["X-Injected"] = "1"
+
+        second = lambda_handler(self._make_event("GET"), None)
+        assert "X-Injected" not in second["headers"]
+
+    def test_unsupported_method_returns_405(self):
+        self._setup_bucket()
+        resp = lambda_handler(self._make_event("DELETE"), None)
+        assert resp["statusCode"] == 405
+        body = json.loads(resp["body"])
+        assert body["error"] == "METHOD_NOT_ALLOWED"
+
+    def test_get_upload_url_returns_200(self):
+        self._setup_bucket()
+        resp = lambda_handler(
+            self._make_event("GET", path="/upload-url"),
+            None,
+        )
+        assert resp["statusCode"] == 200
+        body = json.loads(resp["body"])
+        assert body["key"].startswith("photos/")
+        assert "fields" in body["upload"]
+        assert "url" in body
+
     def test_get_random_photo_empty_returns_404(self):
         self._setup_bucket()
         resp = lambda_handler(
@@ -177,6 +381,8 @@ class TestLambdaHandler:
             "ALLOWED_ORIGIN", "https://gigglegrin.zeusserver.in"
         )
         monkeypatch.setenv("WALL_ALLOWED_ORIGIN", "https://wall.zeusserver.in")
+        get_settings.cache_clear()
+        monkeypatch.setattr(handler, "_SETTINGS", get_settings())
         self._put_photo(key="photos/random-2.jpg")
 
         resp = lambda_handler(
@@ -193,3 +399,48 @@ class TestLambdaHandler:
             resp["headers"]["Access-Control-Allow-Origin"]
             == "https://wall.zeusserver.in"
         )
+
+    def test_disallowed_origin_returns_403(self, monkeypatch):
+        monkeypatch.setenv("ALLOWED_ORIGIN", "https://booth.example.com")
+        monkeypatch.setenv("WALL_ALLOWED_ORIGIN", "https://wall.example.com")
+        get_settings.cache_clear()
+        monkeypatch.setattr(handler, "_SETTINGS", get_settings())
+        self._setup_bucket()
+
+        resp = lambda_handler(
+            self._make_event(
+                "POST",
+                body={"image": make_jpeg_base64()},
+                headers={"origin": "https://evil.example.com"},
+            ),
+            None,
+        )
+
+        assert resp["statusCode"] == 403
+        body = json.loads(resp["body"])
+        assert body["error"] == "FORBIDDEN_ORIGIN"
+        assert "Access-Control-Allow-Origin" not in resp["headers"]
+
+    def test_comma_separated_origins_are_allowed(self, monkeypatch):
+        monkeypatch.setenv(
+            "ALLOWED_ORIGIN",
+            "https://booth.example.com,https://kiosk.example.com",
+        )
+        monkeypatch.setenv("WALL_ALLOWED_ORIGIN", "https://wall.example.com")
+        get_settings.cache_clear()
+        monkeypatch.setattr(handler, "_SETTINGS", get_settings())
+        self._setup_bucket()
+
+        resp = lambda_handler(
+            self._make_event(
+                "OPTIONS",
+                headers={"origin": "https://kiosk.example.com"},
+            ),
+            None,
+        )
+
+        assert resp["statusCode"] == 204
+        assert (
+            resp["headers"]["Access-Control-Allow-Origin"]
+            == "https://kiosk.example.com"
+        )
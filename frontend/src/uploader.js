@@ -1,5 +1,5 @@
 /**
- * uploader.js — API call to Lambda with error handling and retry.
+ * uploader.js — direct-to-S3 upload via a presigned POST, with retry.
  */
 
 import { CONFIG } from "../config.js";
@@ -8,30 +8,45 @@ const MAX_RETRIES = 2;
 const RETRY_DELAY_MS = 1000;
 
 /**
- * Upload a base64-encoded JPEG to the backend.
+ * Upload a base64-encoded JPEG straight to S3.
+ *
+ * Asks the backend for a presigned POST, then sends the raw JPEG to S3
+ * so the image never passes through Lambda.
  *
  * @param {string} base64Image — raw base64 (no data-URI prefix)
  * @returns {Promise<{key: string, url: string}>}
  * @throws {Error} on upload failure after retries
  */
 export async function uploadPhoto(base64Image) {
+  const blob = base64ToBlob(base64Image, "image/jpeg");
   let lastError = null;
 
   for (let attempt = 0; attempt <= MAX_RETRIES; attempt++) {
     try {
-      const response = await fetch(`${CONFIG.API_ENDPOINT}/upload`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ image: base64Image }),
-      });
-
+      const response = await fetch(`${CONFIG.API_ENDPOINT}/upload-url`);
       const data = await response.json();
 
       if (!response.ok) {
         throw new Error(data.message || `Server error ${response.status}`);
       }
 
-      return data;
+      const form = new FormData();
+      for (const [name, value] of Object.entries(data.upload.fields)) {
+        form.append(name, value);
+      }
+      // S3 requires the file to be the last field in the form
+      form.append("file", blob);
+
+      const s3Response = await fetch(data.upload.url, {
+        method: "POST",
+        body: form,
+      });
+
+      if (!s3Response.ok) {
+        throw new Error(`Storage error ${s3Response.status}`);
+      }
+
+      return { key: data.key, url: data.url };
     } catch (err) {
       lastError = err;
       console.warn(
@@ -50,6 +65,20 @@ export async function uploadPhoto(base64Image) {
   );
 }
 
+/**
+ * @param {string} base64 — raw base64 (no data-URI prefix)
+ * @param {string} type — MIME type of the decoded bytes
+ * @returns {Blob}
+ */
+function base64ToBlob(base64, type) {
+  const binary = atob(base64);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return new Blob([bytes], { type });
+}
+
 /**
  * @param {number} ms
  * @returns {Promise<void>}